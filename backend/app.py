@@ -6,16 +6,67 @@ It provides endpoints for URL prediction, history management, and statistics tra
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, constr
 from model_predictor import ModelPredictor
-from typing import List, Dict
-from datetime import datetime
+from prediction_batcher import PredictionBatcher
+from typing import Any, List, Dict, Optional
+from datetime import datetime, timezone
 from urllib.parse import urlparse
+from functools import lru_cache
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+import asyncio
 import json
+import math
 import os
+import re
+import time
+
+# Initialize the machine learning model predictor
+predictor = ModelPredictor()
+
+# Coalesce concurrent single-URL predictions into batched model calls
+batcher = PredictionBatcher(predictor)
+
+# Number of threads running feature extraction off the event loop.
+# Extraction is dominated by fetching pages, so this follows the standard
+# library's default for I/O-bound thread pools
+EXECUTOR_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Thread pool for feature extraction, created per worker process at startup
+executor: Optional[ThreadPoolExecutor] = None
+
+# Single thread for model calls, created per worker process at startup. Model
+# calls take microseconds, so they get their own thread instead of queueing
+# behind page fetches that can hold the extraction threads for seconds
+model_executor: Optional[ThreadPoolExecutor] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the thread pools and the prediction batcher once the event loop is
+    running, and stop them on application shutdown.
+    
+    Args:
+        app (FastAPI): The application being started
+    """
+    global executor, model_executor
+    executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+    model_executor = ThreadPoolExecutor(max_workers=1)
+    batcher.start(model_executor)
+    try:
+        yield
+    finally:
+        await batcher.stop()
+        executor.shutdown(wait=False)
+        model_executor.shutdown(wait=False)
 
 # Initialize FastAPI application
-app = FastAPI()
+# Endpoints declare their return types, so FastAPI serializes responses
+# straight to JSON bytes with Pydantic instead of going through json.dumps
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS middleware to allow cross-origin requests
 # This is essential for the frontend to communicate with the backend
@@ -29,8 +80,20 @@ app.add_middleware(
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
-# Initialize the machine learning model predictor
-predictor = ModelPredictor()
+async def run_blocking(func, *args, pool=None):
+    """
+    Run a blocking function in a thread pool without stalling the event loop.
+    
+    Args:
+        func (callable): The function to run
+        *args: Positional arguments for the function
+        pool (ThreadPoolExecutor): Pool to run the function in (defaults
+            to the feature extraction pool)
+        
+    Returns:
+        The function's return value
+    """
+    return await asyncio.get_running_loop().run_in_executor(pool or executor, func, *args)
 
 # List of trusted domains that are automatically marked as safe
 # These are well-known, reputable websites that are unlikely to be phishing sites
@@ -63,16 +126,75 @@ TRUSTED_DOMAINS = [
     'cloudflare.com'
 ]
 
+def load_trusted_domains(path: str) -> List[str]:
+    """
+    Load additional trusted domains from a file.
+    
+    The file lists one domain per line. Blank lines and lines starting with
+    "#" are ignored, and a leading "*." is accepted since subdomains of a
+    trusted domain are always trusted.
+    
+    Args:
+        path (str): Path to the trusted domains file
+        
+    Returns:
+        list: The trusted domains listed in the file
+    """
+    domains = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            domain = line.strip().lower()
+            if not domain or domain.startswith('#'):
+                continue
+            if domain.startswith('*.'):
+                domain = domain[2:]
+            domains.append(domain.rstrip('.'))
+    return domains
+
+# Trusted domains as a set for constant-time exact lookups, extended with the
+# allowlist file given in TRUSTED_DOMAINS_FILE, if any. A hash set (rather than
+# a probabilistic filter) keeps lookups free of false positives, which would
+# otherwise mark phishing domains as trusted
+TRUSTED_DOMAIN_SET = frozenset(TRUSTED_DOMAINS) | frozenset(
+    load_trusted_domains(os.environ["TRUSTED_DOMAINS_FILE"]) if os.environ.get("TRUSTED_DOMAINS_FILE") else []
+)
+
+# Maximum number of URLs accepted by the batch prediction endpoint
+MAX_BATCH_URLS = 50
+
+# Maximum accepted URL length. URLs are cache keys, so without a bound a
+# client could fill the caches with arbitrarily large strings
+MAX_URL_LENGTH = 8192
+
 # In-memory storage for scan history
-# Stores the last 10 URL scans with their results
-scan_history: List[Dict] = []
+# Stores the last 10 URL scans with their results, newest first
+scan_history: deque = deque(maxlen=10)
+
+# Cache of recent scan results keyed by URL, with only the case-insensitive
+# scheme and host normalized
+# Repeated scans of the same page skip feature extraction and the model;
+# entries expire after an hour so verdicts eventually refresh
+result_cache = TTLCache(maxsize=10_000, ttl=3600)
 
 # Statistics storage for tracking performance metrics
 stats = {
-    "daily_stats": {},  # Daily statistics for URLs scanned and threats blocked
-    "response_times": []  # Response time history for performance monitoring
+    "daily_stats": {},  # Daily statistics for URLs scanned and threats blocked, keyed by UTC epoch day
+    "response_times": deque(maxlen=100),  # Last 100 response times for performance monitoring
+    "response_time_sum": 0.0,  # Running sum of the stored response times
+    "response_time_updates": 0  # Number of response times recorded so far
 }
 
+# Current (UTC) epoch day and its entry in the daily statistics
+current_day = {"epoch_day": None, "stats": None}
+
+# Leading "scheme://" (or scheme-relative "//") of a URL that has a network location,
+# after the leading control characters and spaces that urlparse strips
+URL_WITH_NETLOC_RE = re.compile(r'[\x00-\x20]*(?:[A-Za-z][A-Za-z0-9+.-]*:)?//')
+
+# Scheme, user info and host (with port) at the start of a URL
+URL_AUTHORITY_RE = re.compile(r'((?:[A-Za-z][A-Za-z0-9+.-]*:)?//)?([^/?#@]*@)?([^/?#]*)')
+
+@lru_cache(maxsize=10_000)
 def get_domain(url: str) -> str:
     """
     Extract domain from a URL string.
@@ -84,18 +206,19 @@ def get_domain(url: str) -> str:
         str: The extracted domain or original URL if parsing fails
     """
     try:
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc
-        if not domain and parsed_url.path:
-            # Handle URLs without protocol
-            domain = urlparse(f"https://{url}").netloc
-        return domain
+        # Handle URLs without protocol by adding one up front, so the URL is parsed only once.
+        # Only the start of the URL is checked, since "://" may also appear in its query
+        if not URL_WITH_NETLOC_RE.match(url):
+            url_with_scheme = f"https://{url}"
+        else:
+            url_with_scheme = url
+        return urlparse(url_with_scheme).netloc
     except Exception:
         return url
 
 def is_trusted_domain(domain: str) -> bool:
     """
-    Check if a domain is in the trusted domains list.
+    Check if a domain, or one of its parent domains, is in the trusted domains list.
     
     Args:
         domain (str): The domain to check
@@ -103,32 +226,174 @@ def is_trusted_domain(domain: str) -> bool:
     Returns:
         bool: True if domain is trusted, False otherwise
     """
-    return any(trusted_domain in domain for trusted_domain in TRUSTED_DOMAINS)
+    # Drop credentials, port and trailing dot from the network location
+    host = domain.lower().rpartition('@')[2].partition(':')[0].rstrip('.')
+
+    # Walk the domain suffixes, e.g. mail.google.com -> google.com -> com
+    while host:
+        if host in TRUSTED_DOMAIN_SET:
+            return True
+        host = host.partition('.')[2]
+    return False
 
 def get_today_stats():
     """
     Get or initialize today's statistics.
+    Days roll over at midnight UTC.
     
     Returns:
         dict: Today's statistics including URLs scanned and threats blocked
     """
-    today = datetime.now().date().isoformat()
+    today = int(time.time()) // 86400
+    if today == current_day["epoch_day"]:
+        return current_day["stats"]
+
+    # The day changed: look up (or create) the new day's entry once
     if today not in stats["daily_stats"]:
         stats["daily_stats"][today] = {
             "urls_scanned": 0,
             "threats_blocked": 0
         }
-    return stats["daily_stats"][today]
+    current_day["epoch_day"] = today
+    current_day["stats"] = stats["daily_stats"][today]
+    return current_day["stats"]
+
+def get_cache_key(url: str) -> str:
+    """
+    Build the result cache key of a URL.
+    
+    Scheme and host are lowercased since they are case-insensitive. The rest
+    of the URL is kept verbatim: paths and queries are case-sensitive, and the
+    URL features are computed from the exact string.
+    
+    Args:
+        url (str): The scanned URL
+        
+    Returns:
+        str: The cache key
+    """
+    match = URL_AUTHORITY_RE.match(url)
+    scheme, user_info, host = match.groups()
+    return f"{(scheme or '').lower()}{user_info or ''}{host.lower()}{url[match.end():]}"
+
+def get_cached_result(url: str, timestamp: datetime) -> Optional[Dict]:
+    """
+    Look up a recent scan result for a URL.
+    
+    Args:
+        url (str): The URL being scanned
+        timestamp (datetime): Time of the current scan
+        
+    Returns:
+        dict: A fresh copy of the cached scan result for this URL, or None
+    """
+    cached = result_cache.get(get_cache_key(url))
+    if cached is None:
+        return None
+    return {**cached, "url": url, "timestamp": timestamp}
+
+def cache_result(url: str, result: Dict):
+    """
+    Store a scan result for later lookups of the same URL.
+    
+    Args:
+        url (str): The scanned URL
+        result (dict): The scan result to cache
+    """
+    result_cache[get_cache_key(url)] = result
+
+def build_trusted_result(url: str, timestamp: datetime) -> Dict:
+    """
+    Build the scan result for a URL whose domain is trusted.
+    
+    Args:
+        url (str): The scanned URL
+        timestamp (datetime): Time of the scan
+        
+    Returns:
+        dict: Scan result marking the URL as safe
+    """
+    return {
+        "url": url,
+        "isPhishing": False,
+        "timestamp": timestamp,
+        "message": "URL is from a trusted domain"
+    }
+
+def build_prediction_result(url: str, prediction_result: Dict, timestamp: datetime) -> Dict:
+    """
+    Build the scan result for a URL from the model prediction.
+    
+    Args:
+        url (str): The scanned URL
+        prediction_result (dict): Result returned by the ModelPredictor
+        timestamp (datetime): Time of the scan
+        
+    Returns:
+        dict: Scan result including safety status and features
+    """
+    return {
+        "url": url,
+        "isPhishing": prediction_result["prediction"] == 0,  # 0 is phishing, 1 is legitimate
+        "timestamp": timestamp,
+        "message": f"URL is {prediction_result['result']}",
+        "features": prediction_result.get("features", {})
+    }
+
+def record_scan(result: Dict):
+    """
+    Add a scan result to the history and update daily statistics.
+    
+    Args:
+        result (dict): The scan result to record
+    """
+    # Update scan history, dropping the oldest scan beyond the last 10
+    scan_history.appendleft(result)
+        
+    # Update daily statistics
+    today_stats = get_today_stats()
+    today_stats["urls_scanned"] += 1
+    if result["isPhishing"]:
+        today_stats["threats_blocked"] += 1
+
+def record_response_time(start_ns: int):
+    """
+    Track the response time of a request for performance monitoring.
+    
+    Args:
+        start_ns (int): time.monotonic_ns() when the request started being processed
+    """
+    response_time = (time.monotonic_ns() - start_ns) / 1e6
+    response_times = stats["response_times"]
+
+    # Keep the running sum in step with the last 100 response times
+    if len(response_times) == response_times.maxlen:
+        stats["response_time_sum"] -= response_times[0]
+    response_times.append(response_time)
+    stats["response_time_sum"] += response_time
+
+    # Recompute the sum exactly once per full buffer turnover so floating-point
+    # drift from repeated add/subtract cannot accumulate (amortized O(1))
+    stats["response_time_updates"] += 1
+    if stats["response_time_updates"] % response_times.maxlen == 0:
+        stats["response_time_sum"] = math.fsum(response_times)
 
 class URLInput(BaseModel):
     """
     Pydantic model for URL input validation.
-    Ensures the input contains a valid URL string.
+    Ensures the input contains a valid URL string of at most MAX_URL_LENGTH characters.
     """
-    url: str
+    url: str = Field(..., max_length=MAX_URL_LENGTH)
+
+class URLBatchInput(BaseModel):
+    """
+    Pydantic model for batch URL input validation.
+    Ensures the input contains a list of URL strings of at most MAX_URL_LENGTH characters each.
+    """
+    urls: List[constr(max_length=MAX_URL_LENGTH)]
 
 @app.post("/predict_url")
-async def predict_url(input_data: URLInput):
+async def predict_url(input_data: URLInput) -> Dict[str, Any]:
     """
     Main endpoint for URL phishing prediction.
     Processes the URL and returns prediction results.
@@ -142,70 +407,117 @@ async def predict_url(input_data: URLInput):
     Raises:
         HTTPException: If there's an error in processing the URL
     """
-    start_time = datetime.now()
+    start_ns = time.monotonic_ns()
     
     try:
         url = input_data.url
-        domain = get_domain(url)
-
-        # Check if domain is trusted before running ML prediction
-        if is_trusted_domain(domain):
-            result = {
-                "url": url,
-                "isPhishing": False,
-                "timestamp": datetime.now().isoformat(),
-                "message": "URL is from a trusted domain"
-            }
-        else:
-            # Use ML model to predict if URL is phishing
-            prediction_result = predictor.predict_from_url(url)
-            
-            if "error" in prediction_result:
-                raise HTTPException(status_code=500, detail=prediction_result["error"])
+        timestamp = datetime.now(timezone.utc)
+
+        # Reuse a recent result for the same URL if there is one
+        result = get_cached_result(url, timestamp)
+
+        if result is None:
+            domain = get_domain(url)
+
+            # Check if domain is trusted before running ML prediction
+            if is_trusted_domain(domain):
+                result = build_trusted_result(url, timestamp)
+            else:
+                # Use ML model to predict if URL is phishing
+                features = await run_blocking(predictor.extract_features, url)
                 
-            result = {
-                "url": url,
-                "isPhishing": prediction_result["prediction"] == 0,  # 0 is phishing, 1 is legitimate
-                "timestamp": datetime.now().isoformat(),
-                "message": f"URL is {prediction_result['result']}",
-                "features": prediction_result.get("features", {})
-            }
-
-        # Update scan history
-        scan_history.insert(0, result)
+                if "error" in features:
+                    raise HTTPException(status_code=500, detail=features["error"])
+
+                # Share the model call with other in-flight requests
+                pred = await batcher.submit(predictor.features_to_row(features))
+                prediction_result = predictor.format_prediction(pred, features)
+                    
+                result = build_prediction_result(url, prediction_result, timestamp)
+
+            cache_result(url, result)
+
+        record_scan(result)
+        record_response_time(start_ns)
+        
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict_url_batch")
+async def predict_url_batch(input_data: URLBatchInput) -> List[Dict[str, Any]]:
+    """
+    Batch endpoint for URL phishing prediction.
+    Runs the model once for all non-trusted URLs instead of once per URL.
+    
+    Args:
+        input_data (URLBatchInput): The URLs to analyze
         
-        # Keep only last 10 scans in history
-        if len(scan_history) > 10:
-            scan_history.pop()
-            
-        # Update daily statistics
-        today_stats = get_today_stats()
-        today_stats["urls_scanned"] += 1
-        if result["isPhishing"]:
-            today_stats["threats_blocked"] += 1
+    Returns:
+        list: One result per URL, in input order. URLs that could not be
+            analyzed get an "error" entry instead of a prediction.
         
-        # Track and update response time metrics
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
-        stats["response_times"].append(response_time)
-        # Keep only last 100 response times for average calculation
-        stats["response_times"] = stats["response_times"][-100:]
+    Raises:
+        HTTPException: If too many URLs are submitted or processing fails
+    """
+    if len(input_data.urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_URLS} URLs can be scanned per request")
+
+    # Batch timings are not recorded: the response time statistics describe
+    # single-URL scans, and a batch covering many fetches would skew them
+    try:
+        urls = input_data.urls
+        timestamp = datetime.now(timezone.utc)
+        results = [None] * len(urls)
+        pending = []
+
+        # Cached and trusted URLs are resolved without the model
+        for i, url in enumerate(urls):
+            results[i] = get_cached_result(url, timestamp)
+            if results[i] is not None:
+                continue
+            if is_trusted_domain(get_domain(url)):
+                results[i] = build_trusted_result(url, timestamp)
+                cache_result(url, results[i])
+            else:
+                pending.append(i)
+
+        # Extract features for the remaining URLs concurrently, since each
+        # extraction is dominated by fetching the page
+        features_list = await asyncio.gather(*[
+            run_blocking(predictor.extract_features, urls[i])
+            for i in pending
+        ])
+
+        # Predict all remaining URLs with a single model call
+        predictions = await run_blocking(predictor.predict_features_batch, features_list, pool=model_executor)
+        for i, prediction_result in zip(pending, predictions):
+            if "error" in prediction_result:
+                results[i] = {"url": urls[i], "error": prediction_result["error"]}
+            else:
+                results[i] = build_prediction_result(urls[i], prediction_result, timestamp)
+                cache_result(urls[i], results[i])
+
+        for result in results:
+            if "error" not in result:
+                record_scan(result)
         
-        return result
+        return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/history")
-async def get_history():
+async def get_history() -> List[Dict[str, Any]]:
     """
     Get the scan history.
     
     Returns:
         list: List of recent URL scan results
     """
-    return scan_history
+    return list(scan_history)
 
 @app.delete("/history")
-async def clear_history():
+async def clear_history() -> Dict[str, str]:
     """
     Clear the scan history.
     
@@ -222,7 +534,7 @@ async def clear_history():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/extension_stats")
-async def get_extension_stats():
+async def get_extension_stats() -> Dict[str, int]:
     """
     Get statistics for the browser extension.
     Includes daily scan counts and average response time.
@@ -231,7 +543,7 @@ async def get_extension_stats():
         dict: Statistics including URLs scanned, threats blocked, and response time
     """
     today_stats = get_today_stats()
-    avg_response_time = sum(stats["response_times"][-100:]) / len(stats["response_times"][-100:]) if stats["response_times"] else 0
+    avg_response_time = stats["response_time_sum"] / len(stats["response_times"]) if stats["response_times"] else 0
     
     return {
         "urls_scanned_today": today_stats["urls_scanned"],
@@ -240,7 +552,7 @@ async def get_extension_stats():
     }
 
 @app.get("/")
-async def root():
+async def root() -> Dict[str, str]:
     """
     Root endpoint to check if API is running.
     
@@ -250,7 +562,7 @@ async def root():
     return {"message": "PhishShield API is running"}
 
 @app.options("/{path:path}")
-async def options_handler():
+async def options_handler() -> Dict[str, str]:
     """
     Handle CORS preflight requests.
     
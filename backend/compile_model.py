@@ -0,0 +1,54 @@
+"""
+Model Compiler Module
+This module compiles the trained XGBoost model into a native shared library.
+The library is picked up by ModelPredictor in place of the XGBoost booster.
+
+Usage:
+    python compile_model.py [--model xgb_model.json] [--output model.so] [--quantize]
+
+Requires the optional treelite and tl2cgen packages and a C compiler.
+"""
+
+import argparse
+import os
+import treelite
+import tl2cgen
+import xgboost as xgb
+
+def compile_model(model_path="xgb_model.json", output_path="model.so", quantize=False):
+    """
+    Compile an XGBoost model into a native shared library.
+
+    Args:
+        model_path (str): Path to the XGBoost model file
+        output_path (str): Path of the shared library to create
+        quantize (bool): Whether to compare integer threshold indices
+            instead of float thresholds in the generated tree code. This
+            can change some predictions, so it is off by default
+    """
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    model = treelite.frontend.from_xgboost(booster)
+
+    # Split the generated code into one file per core to parallelize compilation.
+    # With quantization, each input is mapped once to the index of its bin among
+    # the model's split thresholds, and tree nodes compare small integers instead
+    # of floats. Inputs lying on a threshold can then take the other branch, so
+    # predictions are not guaranteed to match the booster.
+    tl2cgen.export_lib(
+        model,
+        toolchain="gcc",
+        libpath=output_path,
+        params={"parallel_comp": os.cpu_count() or 1, "quantize": int(quantize)},
+        options=["-O3", "-march=native"]
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the PhishShield XGBoost model into a native library")
+    parser.add_argument("--model", default="xgb_model.json", help="Path to the XGBoost model file")
+    parser.add_argument("--output", default="model.so", help="Path of the shared library to create")
+    parser.add_argument("--quantize", action="store_true", help="Compare quantized thresholds instead of float ones (may change predictions)")
+    args = parser.parse_args()
+
+    compile_model(args.model, args.output, quantize=args.quantize)
+    print(f"Compiled model written to {args.output}")
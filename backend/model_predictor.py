@@ -4,11 +4,49 @@ This module implements the machine learning prediction functionality for PhishSh
 It uses a pre-trained XGBoost model to classify URLs as phishing or legitimate.
 """
 
+import os
+import threading
+import warnings
 import joblib
 import numpy as np
-import pandas as pd
 import xgboost as xgb
-from url_feature_extractor import URLFeatureExtractor
+from url_feature_extractor import FEATURE_NAMES, extract_features_safely
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import tl2cgen
+except ImportError:
+    tl2cgen = None
+
+def _scale_row_numpy(x, mean, scale, out):
+    """
+    Standardize a feature row into a preallocated output row.
+    
+    Args:
+        x (np.ndarray): 1D float64 raw feature row
+        mean (np.ndarray): Per-feature float64 mean
+        scale (np.ndarray): Per-feature float64 scale
+        out (np.ndarray): 1D float32 row receiving the scaled features
+    """
+    out[:] = (x - mean) / scale
+
+if njit is not None:
+    # No fast-math: the model's split thresholds sit exactly on scaled values,
+    # so the result must match scaler.transform bit for bit
+    @njit(cache=True)
+    def _scale_row(x, mean, scale, out):
+        # Compiled to a single native loop instead of several ufunc dispatches.
+        # Scaling runs in float64 like scaler.transform and is only then
+        # rounded to the float32 model input
+        for i in range(x.shape[0]):
+            out[i] = (x[i] - mean[i]) / scale[i]
+else:
+    # Fall back to NumPy ufuncs when numba is not installed
+    _scale_row = _scale_row_numpy
 
 class ModelPredictor:
     """
@@ -18,28 +56,204 @@ class ModelPredictor:
     whether a URL is phishing or legitimate based on extracted features.
     """
     
-    def __init__(self, model_path="xgb_model.json", scaler_path="scaler.pkl"):
+    def __init__(self, model_path="xgb_model.json", scaler_path="scaler.pkl", compiled_model_path="model.so"):
         """
         Initialize the ModelPredictor with pre-trained model and scaler.
         
         Args:
             model_path (str): Path to the XGBoost model file
             scaler_path (str): Path to the feature scaler file
+            compiled_model_path (str): Path to the natively compiled model
+                built by compile_model.py, used instead of the XGBoost
+                booster when present
         """
         # Load the feature scaler and XGBoost model
         self.scaler = joblib.load(scaler_path)
         self.booster = xgb.Booster()
         self.booster.load_model(model_path)
 
+        # Use the natively compiled model if it has been built. It is loaded
+        # lazily in each process, since its worker threads do not survive the
+        # fork of preloaded server workers
+        self.compiled_model_path = None
+        if tl2cgen is not None and os.path.exists(compiled_model_path):
+            self.compiled_model_path = compiled_model_path
+        self._compiled_model = None
+        self._compiled_model_pid = None
+
         # Define the expected feature columns in the correct order
         # These features are used by the model for prediction
-        self.FEATURE_COLUMNS = [
-            "URLLength", "DomainLength", "TLDLength", "NoOfImage", "NoOfJS", "NoOfCSS", 
-            "NoOfSelfRef", "NoOfExternalRef", "IsHTTPS", "HasObfuscation", "HasTitle", 
-            "HasDescription", "HasSubmitButton", "HasSocialNet", "HasFavicon", 
-            "HasCopyrightInfo", "popUpWindow", "Iframe", "Abnormal_URL", 
-            "LetterToDigitRatio", "Redirect_0", "Redirect_1"
+        self.FEATURE_COLUMNS = list(FEATURE_NAMES)
+
+        # Precompute the scaler's affine transform so single predictions can
+        # be scaled with plain NumPy instead of a DataFrame + scaler.transform.
+        # It is kept in float64: the model's split thresholds sit exactly on
+        # scaled values rounded from float64, so scaling in float32 would send
+        # some rows down the other branch
+        n_features = len(self.FEATURE_COLUMNS)
+        mean = self.scaler.mean_ if self.scaler.with_mean else np.zeros(n_features)
+        scale = self.scaler.scale_ if self.scaler.with_std else np.ones(n_features)
+        self._mean = np.asarray(mean, dtype=np.float64)
+        self._scale = np.asarray(scale, dtype=np.float64)
+
+        # Per-thread reusable raw and model input rows for single predictions
+        self._local = threading.local()
+
+        # Warm up the scaling kernel so JIT compilation does not hit the first request
+        raw_row, input_row = self._get_input_rows()
+        _scale_row(raw_row, self._mean, self._scale, input_row[0])
+
+        # Make sure the fast paths predict exactly like the reference pipeline
+        self._check_parity()
+
+    def _check_parity(self, n_rows=256, atol=1e-5):
+        """
+        Compare the fast prediction paths with scaler.transform + booster.predict.
+        
+        Sample rows are drawn around the scaler's mean, with every feature but
+        LetterToDigitRatio rounded to an integer like the extracted counts and flags.
+        
+        Args:
+            n_rows (int): Number of sample rows to compare
+            atol (float): Largest accepted probability difference
+            
+        Raises:
+            RuntimeError: If a fast path disagrees with the reference pipeline
+        """
+        rng = np.random.default_rng(0)
+        samples = self._mean + self._scale * rng.standard_normal((n_rows, len(self.FEATURE_COLUMNS)))
+        integer_columns = [i for i, c in enumerate(self.FEATURE_COLUMNS) if c != "LetterToDigitRatio"]
+        samples[:, integer_columns] = np.rint(samples[:, integer_columns])
+
+        with warnings.catch_warnings():
+            # The scaler may have been fitted on a DataFrame with feature names
+            warnings.simplefilter("ignore", UserWarning)
+            reference_input = self.scaler.transform(samples)
+        dmatrix = xgb.DMatrix(reference_input, feature_names=self.FEATURE_COLUMNS)
+        expected = self.booster.predict(dmatrix)
+
+        batch_preds = self.predict_matrix(samples)
+        single_preds = [
+            self._predict_features(dict(zip(self.FEATURE_COLUMNS, row)))
+            for row in samples[:8]
         ]
+        if not (np.allclose(batch_preds, expected, rtol=0, atol=atol)
+                and np.allclose(single_preds, expected[:8], rtol=0, atol=atol)):
+            raise RuntimeError("Fast prediction path disagrees with scaler.transform + booster.predict")
+
+    def _get_input_rows(self):
+        """
+        Get the calling thread's reusable raw feature row and model input row.
+        
+        Returns:
+            tuple: (22,) float64 raw row and (1, 22) float32 model input row,
+                both owned by the current thread
+        """
+        rows = getattr(self._local, "rows", None)
+        if rows is None:
+            n_features = len(self.FEATURE_COLUMNS)
+            rows = self._local.rows = (
+                np.zeros(n_features, dtype=np.float64),
+                np.zeros((1, n_features), dtype=np.float32)
+            )
+        return rows
+
+    def _get_compiled_model(self):
+        """
+        Get the natively compiled model, loading it in the current process if needed.
+        
+        Returns:
+            tl2cgen.Predictor: Predictor for the compiled model
+        """
+        if self._compiled_model is None or self._compiled_model_pid != os.getpid():
+            self._compiled_model = tl2cgen.Predictor(self.compiled_model_path)
+            self._compiled_model_pid = os.getpid()
+        return self._compiled_model
+
+    def _predict_scaled(self, scaled_input):
+        """
+        Run the model on scaled feature rows.
+        
+        Args:
+            scaled_input (np.ndarray): C-contiguous float32 array of shape (N, 22)
+            
+        Returns:
+            np.ndarray: Predicted probabilities of the URL being legitimate, one per row
+        """
+        if self.compiled_model_path is not None:
+            pred = self._get_compiled_model().predict(tl2cgen.DMatrix(scaled_input))
+            return pred.reshape(len(scaled_input), -1)[:, 0]
+
+        # Predict directly on the array, skipping DMatrix construction
+        return self.booster.inplace_predict(scaled_input)
+
+    def _predict_features(self, features):
+        """
+        Run the model on a single features dictionary.
+        
+        Args:
+            features (dict): Dictionary of URL features; missing features
+                are passed to the model as missing values
+            
+        Returns:
+            float: Predicted probability of the URL being legitimate
+        """
+        # Fill this thread's reusable raw row in the expected column order
+        # and scale it into the input row using the precomputed scaler parameters
+        raw_row, input_row = self._get_input_rows()
+        raw_row[:] = [features.get(c, np.nan) for c in self.FEATURE_COLUMNS]
+        _scale_row(raw_row, self._mean, self._scale, input_row[0])
+
+        return self._predict_scaled(input_row)[0]
+
+    def extract_features(self, url):
+        """
+        Extract the model features of a URL.
+        
+        Args:
+            url (str): The URL to analyze
+            
+        Returns:
+            dict: Extracted URL features, or a dict with an "error" key if
+                extraction fails
+        """
+        return extract_features_safely(url)
+
+    def features_to_row(self, features):
+        """
+        Convert a features dictionary into a raw model input row.
+        
+        Args:
+            features (dict): Dictionary of extracted URL features
+            
+        Returns:
+            np.ndarray: 1D float64 array ordered like FEATURE_COLUMNS; raw
+                features keep full precision until they are scaled
+        """
+        return np.array([features[c] for c in self.FEATURE_COLUMNS], dtype=np.float64)
+
+    def format_prediction(self, pred, features=None):
+        """
+        Turn a raw model output into a prediction result.
+        
+        Args:
+            pred (float): Predicted probability of the URL being legitimate
+            features (dict): Extracted URL features to include, if any
+            
+        Returns:
+            dict: Prediction results including:
+                - features: Extracted URL features (only if provided)
+                - prediction: Binary prediction (0=phishing, 1=legitimate)
+                - result: Human-readable prediction result
+        """
+        label = int(round(float(pred)))
+        result = {
+            "prediction": label,
+            "result": "Legitimate" if label == 1 else "Phishing"
+        }
+        if features is not None:
+            result = {"features": features, **result}
+        return result
 
     def predict_from_url(self, url):
         """
@@ -56,29 +270,14 @@ class ModelPredictor:
                 - error: Error message if prediction fails
         """
         try:
-            # Extract features from the URL using custom extractor
-            extractor = URLFeatureExtractor(url)
-            features = extractor.extract_model_features()
+            features = self.extract_features(url)
 
             if "error" in features:
                 return {"error": features["error"]}
 
-            # Convert features to DataFrame to align with expected column names
-            input_df = pd.DataFrame([features], columns=self.FEATURE_COLUMNS)
+            pred = self._predict_features(features)
 
-            # Scale features using the pre-trained scaler
-            scaled_input = self.scaler.transform(input_df)
-
-            # Create DMatrix for XGBoost prediction
-            dmatrix = xgb.DMatrix(scaled_input, feature_names=self.FEATURE_COLUMNS)
-            pred = self.booster.predict(dmatrix)
-            label = int(round(pred[0]))
-
-            return {
-                "features": features,
-                "prediction": label,
-                "result": "Legitimate" if label == 1 else "Phishing"
-            }
+            return self.format_prediction(pred, features)
         except Exception as e:
             return {"error": str(e)}
 
@@ -96,22 +295,72 @@ class ModelPredictor:
                 - error: Error message if prediction fails
         """
         try:
-            # Convert features to DataFrame with feature names
-            input_df = pd.DataFrame([features], columns=self.FEATURE_COLUMNS)
+            pred = self._predict_features(features)
+
+            return self.format_prediction(pred)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def predict_matrix(self, features_matrix):
+        """
+        Run the model on a matrix of raw (unscaled) feature rows in one call.
+        
+        Rows are scaled in float64, like scaler.transform, and only the scaled
+        matrix is rounded to the float32 model input.
+        
+        Args:
+            features_matrix (np.ndarray): Array of shape (N, 22) whose columns
+                follow FEATURE_COLUMNS
+            
+        Returns:
+            np.ndarray: Predicted probabilities of the URL being legitimate, one per row
+        """
+        # Scale all rows at once by broadcasting the precomputed scaler parameters
+        features_matrix = np.asarray(features_matrix, dtype=np.float64)
+        scaled_input = ((features_matrix - self._mean) / self._scale).astype(np.float32)
+
+        # Predict the whole batch in one call
+        return self._predict_scaled(scaled_input)
+
+    def predict_features_batch(self, features_list):
+        """
+        Predict if each of several URLs is phishing or legitimate using
+        pre-extracted features, with a single model call.
+        
+        Args:
+            features_list (list): Feature dictionaries as returned by
+                extract_features, possibly containing "error" entries
+            
+        Returns:
+            list: One result per features dictionary, in input order, shaped
+                like the result of predict_from_url
+        """
+        results = [None] * len(features_list)
+        indices = []
+        valid_features = []
 
-            # Scale features using the pre-trained scaler
-            scaled_input = self.scaler.transform(input_df)
+        for i, features in enumerate(features_list):
+            if "error" in features:
+                results[i] = {"error": features["error"]}
+            else:
+                indices.append(i)
+                valid_features.append(features)
 
-            # Create DMatrix for XGBoost prediction
-            dmatrix = xgb.DMatrix(scaled_input, feature_names=self.FEATURE_COLUMNS)
+        if not valid_features:
+            return results
 
-            # Get prediction from model
-            pred = self.booster.predict(dmatrix)
-            label = int(round(pred[0]))
+        try:
+            # Stack feature rows into a single matrix for one model call
+            features_matrix = np.empty((len(valid_features), len(self.FEATURE_COLUMNS)), dtype=np.float64)
+            for row, features in enumerate(valid_features):
+                features_matrix[row] = [features[c] for c in self.FEATURE_COLUMNS]
 
-            return {
-                "prediction": label,
-                "result": "Legitimate" if label == 1 else "Phishing"
-            }
+            preds = self.predict_matrix(features_matrix)
         except Exception as e:
-            return {"error": str(e)} 
\ No newline at end of file
+            for i in indices:
+                results[i] = {"error": str(e)}
+            return results
+
+        for i, features, pred in zip(indices, valid_features, preds):
+            results[i] = self.format_prediction(pred, features)
+        return results
@@ -0,0 +1,127 @@
+"""
+Prediction Batcher Module
+This module implements dynamic request batching for PhishShield.
+It coalesces concurrent single-URL predictions into one batched XGBoost call.
+"""
+
+import asyncio
+import numpy as np
+
+# Maximum number of rows predicted in a single model call
+MAX_BATCH = 32
+
+# Maximum time (in milliseconds) to wait for more rows before predicting
+MAX_WAIT_MS = 5
+
+# Maximum number of rows waiting to be predicted before submitters block
+MAX_QUEUE_SIZE = 1024
+
+class PredictionBatcher:
+    """
+    A class to coalesce concurrent predictions into batched model calls.
+
+    Callers submit a single feature row and await its prediction. A background
+    task collects rows for up to MAX_WAIT_MS milliseconds (or until MAX_BATCH
+    rows are queued), stacks them and runs the model once for the whole batch.
+    """
+
+    def __init__(self, predictor, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, max_queue_size=MAX_QUEUE_SIZE):
+        """
+        Initialize the PredictionBatcher.
+
+        Args:
+            predictor (ModelPredictor): Predictor used to run batched predictions
+            max_batch (int): Maximum number of rows per model call
+            max_wait_ms (float): Maximum time to wait for a batch to fill up
+            max_queue_size (int): Maximum number of rows waiting to be predicted
+        """
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.executor = None
+        self.queue = None
+        self.task = None
+
+    def start(self, executor=None):
+        """
+        Start the background batching task on the running event loop.
+
+        Args:
+            executor (concurrent.futures.Executor): Executor running the model
+                calls off the event loop (defaults to the loop's default executor)
+        """
+        self.executor = executor
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background batching task.
+        """
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, features_row):
+        """
+        Queue a raw feature row and wait for its prediction.
+
+        Args:
+            features_row (np.ndarray): 1D raw (unscaled) feature row
+
+        Returns:
+            float: Predicted probability of the URL being legitimate
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features_row, future))
+        return await future
+
+    async def _collect_batch(self):
+        """
+        Wait for the first queued row, then gather more until the batch is
+        full or the wait time has elapsed.
+
+        Returns:
+            list: Queued (features_row, future) tuples
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """
+        Background loop predicting queued rows in batches.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+
+            try:
+                # Predict off the event loop; rows queued meanwhile form the next batch
+                features_matrix = np.vstack([row for row, _ in batch])
+                preds = await loop.run_in_executor(self.executor, self.predictor.predict_matrix, features_matrix)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), pred in zip(batch, preds):
+                # The submitter may have been cancelled (e.g. client disconnect)
+                if not future.done():
+                    future.set_result(pred)
@@ -0,0 +1,54 @@
+"""
+URL Character Counter Module
+This module counts the letters and digits of URLs for the letter/digit ratio features.
+It uses a Numba-compiled kernel over the URL bytes when numba is installed.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def count_letters_digits_python(url):
+    """
+    Count the letters and digits of a string using str.isalpha/str.isdigit.
+
+    Args:
+        url (str): The string to analyze
+
+    Returns:
+        tuple: Number of letters and number of digits
+    """
+    return sum(map(str.isalpha, url)), sum(map(str.isdigit, url))
+
+if njit is not None:
+    @njit(cache=True)
+    def _count_ascii_letters_digits(buf):
+        # Branchless range checks over the bytes, which LLVM can vectorize
+        letters = 0
+        digits = 0
+        for b in buf:
+            letters += ((b >= 65) & (b <= 90)) | ((b >= 97) & (b <= 122))
+            digits += (b >= 48) & (b <= 57)
+        return letters, digits
+
+def count_letters_digits(url):
+    """
+    Count the letters and digits of a URL.
+
+    Args:
+        url (str): The URL to analyze
+
+    Returns:
+        tuple: Number of letters and number of digits
+    """
+    # The byte kernel only agrees with str.isalpha/str.isdigit on ASCII input
+    if njit is not None and url.isascii():
+        letters, digits = _count_ascii_letters_digits(np.frombuffer(url.encode('ascii'), dtype=np.uint8))
+        return int(letters), int(digits)
+    return count_letters_digits_python(url)
+
+# Compile the kernel at import so JIT compilation does not hit the first request
+count_letters_digits('a1')
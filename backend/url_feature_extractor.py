@@ -4,12 +4,102 @@ This module implements feature extraction from URLs for phishing detection.
 It analyzes various aspects of URLs and web pages to extract features used by the ML model.
 """
 
+import ipaddress
 import re
 import socket
+from http.cookiejar import DefaultCookiePolicy
+from collections import defaultdict
+from functools import cached_property, lru_cache
+from itertools import chain
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urlparse, urljoin
-from tld import get_tld
+from url_char_counter import count_letters_digits
+
+try:
+    import re2 as _re
+except ImportError:
+    _re = re
+
+# Maximum number of bytes read from a page. The model was trained on features
+# of whole pages, so for pages larger than this, counts such as NoOfImage and
+# markers near the end (e.g. a copyright footer) diverge from training-time
+# features. The cap is set well above typical page sizes to keep this rare,
+# while still bounding memory for very large or endless responses
+MAX_PAGE_BYTES = 16 * 1024 * 1024
+
+# Shared HTTP session with pooled keep-alive connections, so repeated fetches
+# from the same hosts skip the DNS lookup and TCP/TLS handshakes. Cookies are
+# not kept, so every scan sees a page as a first-time visitor would
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'Mozilla/5.0'})
+SESSION.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+# Connection errors (e.g. on a stale pooled connection) are retried once; read
+# errors are not, so a server that never answers costs a single timeout
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=1, read=False))
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+# Only the tags read by the feature methods are parsed into the tree
+PARSED_TAGS = SoupStrainer(['a', 'link', 'script', 'img', 'iframe', 'input', 'button', 'meta', 'title'])
+
+# Regular expressions used by the feature methods, compiled once at import.
+# Obfuscation and abnormal-URL markers are fused into single alternations so
+# the input is scanned once rather than once per marker. IP hosts are detected
+# from the parsed hostname by is_abnormal_url, not by scanning the URL.
+# These patterns need no backtracking features, so they are compiled with RE2
+# (linear-time matching) when google-re2 is installed
+OBFUSCATION_RE = _re.compile(
+    r'%[0-9a-fA-F]{2}|\\x[0-9a-fA-F]{2}|&#x[0-9a-fA-F]+;'
+    r'|javascript:|eval\(|document\.write|fromCharCode'
+)
+ABNORMAL_URL_RE = _re.compile(r'@|\.(?:exe|zip|rar|dll|js)$')
+POPUP_WINDOW_RE = _re.compile(r'window\.open\s*\(')
+
+# URL with a (non-empty) network location, matching in any case the schemes
+# urlparse recognizes and skipping the leading control characters and spaces it strips
+NETLOC_URL_RE = re.compile(r'[\x00-\x20]*[A-Za-z][A-Za-z0-9+.-]*://[^/?#]')
+
+# Names of the features used by the ML model, in model column order
+FEATURE_NAMES = (
+    'URLLength', 'DomainLength', 'TLDLength', 'NoOfImage', 'NoOfJS', 'NoOfCSS',
+    'NoOfSelfRef', 'NoOfExternalRef', 'IsHTTPS', 'HasObfuscation', 'HasTitle',
+    'HasDescription', 'HasSubmitButton', 'HasSocialNet', 'HasFavicon',
+    'HasCopyrightInfo', 'popUpWindow', 'Iframe', 'Abnormal_URL',
+    'LetterToDigitRatio', 'Redirect_0', 'Redirect_1'
+)
+
+# Social networks whose names mark a page as referencing social media
+SOCIAL_NETWORKS = ('facebook', 'twitter', 'linkedin', 'instagram', 'youtube', 'pinterest')
+
+# Copyright markers looked up in the lowercased raw HTML, including the
+# entity spellings of the copyright sign that page text would decode
+COPYRIGHT_MARKERS = ('copyright', '©', '&copy', '&#169;', '&#xa9;')
+
+@lru_cache(maxsize=10_000)
+def get_tld_length(netloc):
+    """
+    Get the length of the top-level domain (TLD) of a network location.
+    Results are cached per host, since the public suffix lookup is costly.
+    
+    Args:
+        netloc (str): Network location (host) of a URL
+        
+    Returns:
+        int: Length of the TLD, 0 if it cannot be determined
+    """
+    if not netloc:
+        return 0
+    try:
+        # tld loads its public suffix list on first use, so only import it when needed
+        from tld import get_tld
+        tld = get_tld(f"http://{netloc}", fail_silently=True)
+        return len(tld) if tld else 0
+    except:
+        return 0
 
 class URLFeatureExtractor:
     """
@@ -31,20 +121,49 @@ class URLFeatureExtractor:
         self.timeout = timeout
         self.parsed_url = self.safe_parse(url)
         self.domain = self.parsed_url.netloc if self.parsed_url else ''
+        self._base_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}" if self.parsed_url else None
         self.soup = None
         self.page_content = None
         self.response = None
         self.error = None
 
         try:
-            # Make HTTP request with custom user agent
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            self.response = requests.get(url, headers=headers, timeout=self.timeout)
-            self.page_content = self.response.text
-            self.soup = BeautifulSoup(self.page_content, 'html.parser')
+            # Stream the page through the shared session, reading at most MAX_PAGE_BYTES
+            self.response = SESSION.get(url, timeout=self.timeout, stream=True)
+            self.page_content = self.read_page(self.response)
+            # lxml is a C parser, much faster than the pure-Python 'html.parser'
+            self.soup = BeautifulSoup(self.page_content, 'lxml', parse_only=PARSED_TAGS)
         except Exception as e:
             self.error = str(e)
 
+    def read_page(self, response):
+        """
+        Read and decode at most MAX_PAGE_BYTES of a streamed response body.
+        
+        Args:
+            response (requests.Response): The streamed HTTP response
+            
+        Returns:
+            str: The decoded (possibly truncated) page content
+        """
+        chunks = []
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_PAGE_BYTES:
+                    break
+        finally:
+            response.close()
+
+        content = b''.join(chunks)[:MAX_PAGE_BYTES]
+        try:
+            return content.decode(response.encoding or 'utf-8', errors='replace')
+        except LookupError:
+            # Unknown charset announced by the server
+            return content.decode('utf-8', errors='replace')
+
     def safe_parse(self, url):
         """
         Safely parse a URL, handling potential errors.
@@ -85,11 +204,14 @@ class URLFeatureExtractor:
         Returns:
             int: Length of the TLD
         """
-        try:
-            tld = get_tld(self.url, fail_silently=True)
-            return len(tld) if tld else 0
-        except:
-            return 0
+        return get_tld_length(self.domain)
+
+    @cached_property
+    def _char_counts(self):
+        """
+        Numbers of letters and digits in the URL, counted once per extractor.
+        """
+        return count_letters_digits(self.url)
 
     def get_letter_ratio_in_url(self):
         """
@@ -98,8 +220,7 @@ class URLFeatureExtractor:
         Returns:
             float: Ratio of letters to total characters
         """
-        letters = sum(c.isalpha() for c in self.url)
-        return letters / len(self.url) if self.url else 0
+        return self._char_counts[0] / len(self.url) if self.url else 0
 
     def get_digit_ratio_in_url(self):
         """
@@ -108,8 +229,25 @@ class URLFeatureExtractor:
         Returns:
             float: Ratio of digits to total characters
         """
-        digits = sum(c.isdigit() for c in self.url)
-        return digits / len(self.url) if self.url else 0
+        return self._char_counts[1] / len(self.url) if self.url else 0
+
+    @cached_property
+    def _lower_content(self):
+        """
+        Lower-cased page content, computed once for case-insensitive checks.
+        """
+        return self.page_content.lower() if self.page_content else ''
+
+    @cached_property
+    def _tags_by_name(self):
+        """
+        Parsed tags grouped by tag name, in document order, built in one tree walk.
+        """
+        tags_by_name = defaultdict(list)
+        if self.soup:
+            for tag in self.soup.find_all(True):
+                tags_by_name[tag.name].append(tag)
+        return dict(tags_by_name)
 
     def get_no_of_images(self):
         """
@@ -118,7 +256,7 @@ class URLFeatureExtractor:
         Returns:
             int: Number of images
         """
-        return len(self.soup.find_all('img')) if self.soup else 0
+        return len(self._tags_by_name.get('img', ()))
 
     def get_no_of_js(self):
         """
@@ -127,7 +265,7 @@ class URLFeatureExtractor:
         Returns:
             int: Number of JavaScript files
         """
-        return len(self.soup.find_all('script')) if self.soup else 0
+        return len(self._tags_by_name.get('script', ()))
 
     def get_no_of_css(self):
         """
@@ -136,7 +274,41 @@ class URLFeatureExtractor:
         Returns:
             int: Number of CSS files
         """
-        return len(self.soup.find_all('link', {'rel': 'stylesheet'})) if self.soup else 0
+        links = self._tags_by_name.get('link', ())
+        return sum(1 for tag in links if 'stylesheet' in tag.get_attribute_list('rel'))
+
+    @cached_property
+    def _ref_counts(self):
+        """
+        Numbers of self-referential and external references in the web page,
+        counted in a single pass over the referencing tags.
+        """
+        if not self.soup or not self.parsed_url:
+            return 0, 0
+        base_url = self._base_url
+        self_count = 0
+        external_count = 0
+        # Anchors and links reference through href, scripts and images through
+        # src, so each tag needs a single attribute lookup
+        tags = self._tags_by_name
+        hrefs = (tag.get('href') for tag in chain(tags.get('a', ()), tags.get('link', ())))
+        srcs = (tag.get('src') for tag in chain(tags.get('script', ()), tags.get('img', ())))
+        for url in chain(hrefs, srcs):
+            if not url:
+                continue
+            # Absolute same-site and root-relative references resolve to the
+            # base URL without needing urljoin
+            if url.startswith(base_url) or (url.startswith('/') and not url.startswith('//')):
+                self_count += 1
+                continue
+            full = urljoin(base_url, url)
+            if full.startswith(base_url):
+                self_count += 1
+            # urljoin leaves references to other hosts absolute, so a
+            # scheme:// prefix tells them from mailto:, javascript: etc.
+            elif NETLOC_URL_RE.match(full):
+                external_count += 1
+        return self_count, external_count
 
     def get_no_of_self_ref(self):
         """
@@ -145,17 +317,7 @@ class URLFeatureExtractor:
         Returns:
             int: Number of self-referential links
         """
-        if not self.soup or not self.parsed_url:
-            return 0
-        base_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}"
-        count = 0
-        for tag in self.soup.find_all(['a', 'link', 'script', 'img']):
-            url = tag.get('href') or tag.get('src')
-            if url:
-                full = urljoin(base_url, url)
-                if full.startswith(base_url):
-                    count += 1
-        return count
+        return self._ref_counts[0]
 
     def get_no_of_external_ref(self):
         """
@@ -164,17 +326,7 @@ class URLFeatureExtractor:
         Returns:
             int: Number of external references
         """
-        if not self.soup or not self.parsed_url:
-            return 0
-        base_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}"
-        count = 0
-        for tag in self.soup.find_all(['a', 'link', 'script', 'img']):
-            url = tag.get('href') or tag.get('src')
-            if url:
-                full = urljoin(base_url, url)
-                if not full.startswith(base_url) and urlparse(full).netloc:
-                    count += 1
-        return count
+        return self._ref_counts[1]
 
     def is_https(self):
         """
@@ -194,11 +346,7 @@ class URLFeatureExtractor:
         """
         if not self.page_content:
             return 0
-        patterns = [
-            r'%[0-9a-fA-F]{2}', r'\\x[0-9a-fA-F]{2}', r'&#x[0-9a-fA-F]+;',
-            r'javascript:', r'eval\(', r'document\.write', r'fromCharCode'
-        ]
-        return 1 if any(re.search(p, self.page_content) for p in patterns) else 0
+        return 1 if OBFUSCATION_RE.search(self.page_content) else 0
 
     def has_title(self):
         """
@@ -207,7 +355,10 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if title exists, 0 otherwise
         """
-        return 1 if self.soup and self.soup.title and self.soup.title.string.strip() else 0
+        title = self.soup.title if self.soup else None
+        # .string is None for an empty <title> or one with nested tags
+        text = title.string if title else None
+        return 1 if text and text.strip() else 0
 
     def has_description(self):
         """
@@ -216,7 +367,8 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if description exists, 0 otherwise
         """
-        tag = self.soup.find('meta', attrs={'name': 'description'}) if self.soup else None
+        metas = self._tags_by_name.get('meta', ())
+        tag = next((meta for meta in metas if meta.get('name') == 'description'), None)
         return 1 if tag and tag.get('content', '').strip() else 0
 
     def has_submit_button(self):
@@ -226,9 +378,10 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if submit button exists, 0 otherwise
         """
-        if not self.soup:
-            return 0
-        return 1 if self.soup.find('input', {'type': 'submit'}) or self.soup.find('button') else 0
+        if 'button' in self._tags_by_name:
+            return 1
+        inputs = self._tags_by_name.get('input', ())
+        return 1 if any(tag.get('type', '').lower() == 'submit' for tag in inputs) else 0
 
     def has_social_net(self):
         """
@@ -237,9 +390,8 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if social network references exist, 0 otherwise
         """
-        if not self.soup:
-            return 0
-        return 1 if re.search(r'facebook|twitter|linkedin|instagram|youtube|pinterest', self.soup.decode(), re.I) else 0
+        lower_content = self._lower_content
+        return 1 if any(name in lower_content for name in SOCIAL_NETWORKS) else 0
 
     def has_favicon(self):
         """
@@ -248,7 +400,12 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if favicon exists, 0 otherwise
         """
-        return 1 if self.soup and self.soup.find('link', rel=re.compile('icon', re.I)) else 0
+        links = self._tags_by_name.get('link', ())
+        return 1 if any(
+            rel and 'icon' in rel.lower()
+            for tag in links
+            for rel in tag.get_attribute_list('rel')
+        ) else 0
 
     def has_copyright_info(self):
         """
@@ -257,9 +414,8 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if copyright info exists, 0 otherwise
         """
-        if not self.soup:
-            return 0
-        return 1 if re.search(r'copyright|©', self.soup.get_text(), re.I) else 0
+        lower_content = self._lower_content
+        return 1 if any(marker in lower_content for marker in COPYRIGHT_MARKERS) else 0
 
     def has_popup_window(self):
         """
@@ -268,7 +424,7 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if popup code exists, 0 otherwise
         """
-        return 1 if self.page_content and re.search(r'window\.open\s*\(', self.page_content) else 0
+        return 1 if self.page_content and POPUP_WINDOW_RE.search(self.page_content) else 0
 
     def has_iframe(self):
         """
@@ -277,7 +433,7 @@ class URLFeatureExtractor:
         Returns:
             int: 1 if iframe exists, 0 otherwise
         """
-        return 1 if self.soup and self.soup.find('iframe') else 0
+        return 1 if 'iframe' in self._tags_by_name else 0
 
     def is_abnormal_url(self):
         """
@@ -288,8 +444,14 @@ class URLFeatureExtractor:
         """
         if not self.url:
             return 0
-        patterns = [r'@', r'//\w+@', r'\d+\.\d+\.\d+\.\d+', r'\.(exe|zip|rar|dll|js)$']
-        return 1 if any(re.search(p, self.url) for p in patterns) else 0
+        # A host given as an IP address rather than a domain name
+        if self.parsed_url and self.parsed_url.hostname:
+            try:
+                ipaddress.ip_address(self.parsed_url.hostname)
+                return 1
+            except ValueError:
+                pass
+        return 1 if ABNORMAL_URL_RE.search(self.url) else 0
 
     def get_redirect_value(self):
         """
@@ -302,16 +464,16 @@ class URLFeatureExtractor:
             return 0
         return 1 if len(self.response.history)>0 else -1
 
-    def extract_model_features(self):
+    def _feature_dict(self):
         """
-        Extract all features required by the ML model.
+        Compute all features required by the ML model.
+        
+        The dictionary is built as a literal, the cheapest way to produce it
+        in CPython; its keys follow FEATURE_NAMES order.
         
         Returns:
-            dict: Dictionary of extracted features or error message
+            dict: Dictionary of extracted features
         """
-        if self.error:
-            return {"error": self.error}
-
         redirect_value = self.get_redirect_value()
 
         # Map redirect values to binary features
@@ -325,28 +487,72 @@ class URLFeatureExtractor:
             redirect_0 = 0
             redirect_1 = 1
 
-        # Return all extracted features
         return {
-            'URLLength': self.get_url_length(),
-            'DomainLength': self.get_domain_length(),
-            'TLDLength': self.get_tld_length(),
-            'NoOfImage': self.get_no_of_images(),
-            'NoOfJS': self.get_no_of_js(),
-            'NoOfCSS': self.get_no_of_css(),
-            'NoOfSelfRef': self.get_no_of_self_ref(),
-            'NoOfExternalRef': self.get_no_of_external_ref(),
-            'IsHTTPS': self.is_https(),
-            'HasObfuscation': self.has_obfuscation(),
-            'HasTitle': self.has_title(),
-            'HasDescription': self.has_description(),
-            'HasSubmitButton': self.has_submit_button(),
-            'HasSocialNet': self.has_social_net(),
-            'HasFavicon': self.has_favicon(),
-            'HasCopyrightInfo': self.has_copyright_info(),
-            'popUpWindow': self.has_popup_window(),
-            'Iframe': self.has_iframe(),
-            'Abnormal_URL': self.is_abnormal_url(),
-            'LetterToDigitRatio': self.get_letter_ratio_in_url() / (self.get_digit_ratio_in_url() + 1e-5),
-            'Redirect_0': redirect_0,
-            'Redirect_1': redirect_1
-        } 
\ No newline at end of file
+            "URLLength": self.get_url_length(),
+            "DomainLength": self.get_domain_length(),
+            "TLDLength": self.get_tld_length(),
+            "NoOfImage": self.get_no_of_images(),
+            "NoOfJS": self.get_no_of_js(),
+            "NoOfCSS": self.get_no_of_css(),
+            "NoOfSelfRef": self.get_no_of_self_ref(),
+            "NoOfExternalRef": self.get_no_of_external_ref(),
+            "IsHTTPS": self.is_https(),
+            "HasObfuscation": self.has_obfuscation(),
+            "HasTitle": self.has_title(),
+            "HasDescription": self.has_description(),
+            "HasSubmitButton": self.has_submit_button(),
+            "HasSocialNet": self.has_social_net(),
+            "HasFavicon": self.has_favicon(),
+            "HasCopyrightInfo": self.has_copyright_info(),
+            "popUpWindow": self.has_popup_window(),
+            "Iframe": self.has_iframe(),
+            "Abnormal_URL": self.is_abnormal_url(),
+            "LetterToDigitRatio": self.get_letter_ratio_in_url() / (self.get_digit_ratio_in_url() + 1e-5),
+            "Redirect_0": redirect_0,
+            "Redirect_1": redirect_1
+        }
+
+    def extract_model_features(self):
+        """
+        Extract all features required by the ML model.
+        
+        Returns:
+            dict: Dictionary of extracted features or error message
+        """
+        if self.error:
+            return {"error": self.error}
+
+        return self._feature_dict()
+
+    def extract_model_vector(self):
+        """
+        Extract all features required by the ML model as a numeric row.
+        
+        Rows from several URLs can be stacked with np.vstack and passed to
+        ModelPredictor.predict_matrix. Rows are float64, since raw features
+        must keep full precision until they are scaled.
+        
+        Returns:
+            np.ndarray: 1D float64 array in FEATURE_NAMES order, or None if
+                the page could not be fetched (see self.error)
+        """
+        if self.error:
+            return None
+
+        return np.fromiter(self._feature_dict().values(), dtype=np.float64, count=len(FEATURE_NAMES))
+
+def extract_features_safely(url, timeout=10):
+    """
+    Extract the model features of a URL, reporting failures as an error entry.
+    
+    Args:
+        url (str): The URL to analyze
+        timeout (int): Timeout in seconds for HTTP requests
+        
+    Returns:
+        dict: Dictionary of extracted features or error message
+    """
+    try:
+        return URLFeatureExtractor(url, timeout).extract_model_features()
+    except Exception as e:
+        return {"error": str(e)}